@@ -2,239 +2,49 @@
 """
 SamsoftEmu NES v1.1 (Tkinter GUI Frontend + iNES/NES 2.0 header parser)
 Frontend for a future FCEUX-class emulator.
-Single-file build: program.py
+iNES / NES 2.0 parsing lives in samsoft_ines.py, shared with samsoftnesv0.py.
 
 What’s new in v1.1
 - Adds robust iNES 1.0 and partial NES 2.0 header parsing (mapper, submapper, PRG/CHR sizes, RAM/NVRAM, mirroring, trainer, TV system).
 - Displays Cartridge Info via Tools → Cartridge Info.
 - Logs detailed header analysis to the Emulator Log.
-- Keeps everything in one file (no external data files required).
+- No external data files required.
 
 This file does NOT emulate CPU/PPU/APU yet; “Run” remains a stub that simply demonstrates that a ROM has been parsed.
 """
 
+import collections
 import os
 import sys
-import struct
 import tkinter as tk
-from dataclasses import dataclass
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
-# ------------------------------
-# iNES / NES 2.0 Data Structures
-# ------------------------------
-
-@dataclass
-class INESHeader:
-    format: str                 # "iNES" or "NES 2.0" (or "Archaic iNES")
-    mapper: int
-    submapper: int | None
-    mapper_name: str
-    prg_rom_size: int           # bytes
-    chr_rom_size: int           # bytes
-    prg_ram_size: int           # bytes (volatile)
-    prg_nvram_size: int         # bytes (battery-backed)
-    chr_ram_size: int           # bytes
-    chr_nvram_size: int         # bytes
-    mirroring: str              # "Horizontal", "Vertical", or "Four-screen VRAM"
-    has_battery: bool
-    has_trainer: bool
-    four_screen: bool
-    tv_system: str              # "NTSC", "PAL", "Both", etc.
-    vs_unisystem: bool
-    playchoice10: bool
-
-@dataclass
-class Cartridge:
-    header: INESHeader
-    prg_rom: bytes
-    chr_rom: bytes
-    trainer: bytes | None
-    raw_header: bytes
-
-
-MAPPER_NAMES: dict[int, str] = {
-    0: "NROM",
-    1: "MMC1 (SxROM)",
-    2: "UNROM (UxROM)",
-    3: "CNROM (CxROM)",
-    4: "MMC3 (TxROM)",
-    5: "MMC5 (ExROM)",
-    7: "AOROM (AxROM)",
-    9: "MMC2 (PxROM)",
-    10: "MMC4 (FxROM)",
-    11: "Color Dreams",
-    13: "CPROM",
-    15: "100-in-1",
-    66: "GxROM/MxROM",
-    69: "FME-7 / Sunsoft 5",
-    71: "Camerica (BF909x)",
-    73: "VRC3",
-    75: "VRC1",
-    76: "VRC4",
-    78: "Irem 74HC161/32",
-    79: "NINA-003/006",
-    85: "VRC7",
-    87: "VRC2",
-    94: "HVC-UN1ROM",
-    118: "TxSROM",
-    119: "TQROM",
-    210: "Namco 129/163",
-    # Many more exist; unknowns will be displayed as "Unknown/Custom".
-}
-
-
-def _fmt_size(n_bytes: int) -> str:
-    if n_bytes == 0:
-        return "0 B"
-    units = ["B", "KB", "MB"]
-    size = float(n_bytes)
-    idx = 0
-    while size >= 1024.0 and idx < len(units) - 1:
-        size /= 1024.0
-        idx += 1
-    if idx == 0:
-        return f"{int(size)} {units[idx]}"
-    return f"{size:.1f} {units[idx]}"
-
-
-def _exp_to_size(exp: int) -> int:
-    """NES 2.0 RAM/NVRAM size encoding: 2^exp × 64 bytes (0 means absent)."""
-    if exp == 0:
-        return 0
-    return (64 << exp)
-
-
-def parse_ines_file(path: str) -> Cartridge:
-    """Parse a .nes file, returning a Cartridge with header + PRG/CHR slices.
-    Supports iNES 1.0 and (partially) NES 2.0.
-    Raises ValueError on invalid header or inconsistent sizes.
-    """
-    with open(path, "rb") as f:
-        data = f.read()
-
-    if len(data) < 16:
-        raise ValueError("File too small to contain an iNES header.")
-
-    header = data[:16]
-    if header[:4] != b"NES\x1A":
-        raise ValueError("Missing NES\x1A magic; not an iNES/NES2.0 ROM.")
-
-    prg_units = header[4]             # 16KB units
-    chr_units = header[5]             # 8KB units
-    flags6 = header[6]
-    flags7 = header[7]
-    flags8 = header[8] if len(header) >= 9 else 0
-    flags9 = header[9] if len(header) >= 10 else 0
-    flags10 = header[10] if len(header) >= 11 else 0
-    flags11 = header[11] if len(header) >= 12 else 0
-    flags12 = header[12] if len(header) >= 13 else 0
-
-    # Detect format
-    # NES 2.0 if ((flags7 & 0x0C) == 0x08). Otherwise iNES 1.0 (or archaic).
-    is_nes20 = (flags7 & 0x0C) == 0x08
-    format_name = "NES 2.0" if is_nes20 else "iNES"
-
-    # Mapper and Submapper
-    mapper_low = (flags6 >> 4) | (flags7 & 0xF0)  # bits 0..7
-    submapper: int | None = None
-    if is_nes20:
-        mapper_ext = flags8 & 0x0F  # adds bits 8..11
-        mapper = mapper_low | (mapper_ext << 8)
-        submapper = (flags8 >> 4) & 0x0F
-    else:
-        mapper = mapper_low
-
-    # Sizes
-    if is_nes20:
-        prg_rom_size = (prg_units | ((flags9 & 0x0F) << 8)) * 16 * 1024
-        chr_rom_size = (chr_units | ((flags9 & 0xF0) << 4)) * 8 * 1024
-        prg_ram_size = _exp_to_size(flags10 & 0x0F)
-        prg_nvram_size = _exp_to_size((flags10 >> 4) & 0x0F)
-        chr_ram_size = _exp_to_size(flags11 & 0x0F)
-        chr_nvram_size = _exp_to_size((flags11 >> 4) & 0x0F)
-    else:
-        prg_rom_size = prg_units * 16 * 1024
-        chr_rom_size = chr_units * 8 * 1024
-        # iNES: byte 8 is PRG-RAM size in 8KB units; 0 implies 8KB for some mappers.
-        prg_ram_size = (flags8 * 8 * 1024) if flags8 else (8 * 1024 if mapper in (1, 4) else 0)
-        prg_nvram_size = 0
-        # If no CHR ROM, assume 8KB CHR-RAM (common).
-        chr_ram_size = 8 * 1024 if chr_rom_size == 0 else 0
-        chr_nvram_size = 0
-
-    # Flags
-    vert_mirr = bool(flags6 & 0x01)
-    has_battery = bool(flags6 & 0x02)
-    has_trainer = bool(flags6 & 0x04)
-    four_screen = bool(flags6 & 0x08)
-    mirroring = "Vertical" if vert_mirr else "Horizontal"
-    if four_screen:
-        mirroring = "Four-screen VRAM"
-
-    vs_unisystem = bool(flags7 & 0x01)
-    playchoice10 = bool(flags7 & 0x02)
-
-    # TV system (best-effort)
-    if is_nes20:
-        tv_code = flags12 & 0x03
-        tv_system = {0: "NTSC", 1: "PAL", 2: "Both (NTSC/PAL)", 3: "Dendy/Reserved"}.get(tv_code, "Unknown")
-    else:
-        tv_system = "PAL" if (flags9 & 0x01) else "NTSC"
-
-    # Compute data offsets
-    offset = 16
-    trainer_data = None
-    if has_trainer:
-        if len(data) < offset + 512:
-            raise ValueError("Header indicates trainer but file is too small.")
-        trainer_data = data[offset:offset + 512]
-        offset += 512
-
-    if len(data) < offset + prg_rom_size:
-        raise ValueError("File truncated: PRG ROM is smaller than indicated by header.")
-    prg_data = data[offset:offset + prg_rom_size]
-    offset += prg_rom_size
-
-    if len(data) < offset + chr_rom_size:
-        raise ValueError("File truncated: CHR ROM is smaller than indicated by header.")
-    chr_data = data[offset:offset + chr_rom_size]
-
-    mapper_name = MAPPER_NAMES.get(mapper, "Unknown/Custom")
-
-    ines_header = INESHeader(
-        format=format_name,
-        mapper=mapper,
-        submapper=submapper,
-        mapper_name=mapper_name,
-        prg_rom_size=prg_rom_size,
-        chr_rom_size=chr_rom_size,
-        prg_ram_size=prg_ram_size,
-        prg_nvram_size=prg_nvram_size,
-        chr_ram_size=chr_ram_size,
-        chr_nvram_size=chr_nvram_size,
-        mirroring=mirroring,
-        has_battery=has_battery,
-        has_trainer=has_trainer,
-        four_screen=four_screen,
-        tv_system=tv_system,
-        vs_unisystem=vs_unisystem,
-        playchoice10=playchoice10,
-    )
-
-    return Cartridge(
-        header=ines_header,
-        prg_rom=prg_data,
-        chr_rom=chr_data,
-        trainer=trainer_data,
-        raw_header=header,
-    )
+from samsoft_ines import Cartridge, INESHeader, fmt_size, parse_ines_file
+
+# Cartridge Info dialog body; filled from the header plus preformatted sizes/flags.
+_CART_INFO_TMPL = (
+    "Format: {h.format}\n"
+    "Mapper: {h.mapper} ({h.mapper_name}){submapper}\n"
+    "\n"
+    "PRG-ROM: {prg_rom}\n"
+    "CHR-ROM: {chr_rom}{chr_note}\n"
+    "PRG-RAM: {prg_ram}\n"
+    "PRG-NVRAM (battery): {prg_nvram}\n"
+    "CHR-RAM: {chr_ram}\n"
+    "CHR-NVRAM: {chr_nvram}\n"
+    "\n"
+    "Mirroring: {h.mirroring}\n"
+    "Battery: {battery}   Trainer: {trainer}\n"
+    "VS Unisystem: {vs}   PlayChoice-10: {pc10}\n"
+    "TV System: {h.tv_system}"
+).format_map
 
 
 # ------------------------------
 # Tkinter GUI
 # ------------------------------
 
+
 class SamsoftEmuNESGUI:
     def __init__(self, root):
         self.root = root
@@ -244,10 +54,21 @@ class SamsoftEmuNESGUI:
 
         # Emulator state
         self.rom_path: str | None = None
+        self.rom_basename: str | None = None
         self.cartridge: Cartridge | None = None
         self.is_running = False
         self.version = "1.1"
 
+        # Console lines waiting for the next idle flush
+        self._log_buf: collections.deque[str] = collections.deque()
+        self._log_pending = False
+        # Autoscroll is deferred to a timer so bursts repaint at most ~30 times a second
+        self._scroll_pending = False
+
+        # Cartridge Info window, kept hidden between opens and rebuilt per cartridge
+        self._cart_info_win: tk.Toplevel | None = None
+        self._cart_info_for: Cartridge | None = None
+
         # UI setup
         self.create_menu()
         self.create_toolbar()
@@ -320,10 +141,26 @@ class SamsoftEmuNESGUI:
         self.console.pack(fill=tk.BOTH, expand=True)
 
     def log(self, msg: str):
+        # Queue the line; bursts of log() calls are written by a single idle flush.
+        self._log_buf.append(msg)
+        if not self._log_pending:
+            self._log_pending = True
+            self.root.after_idle(self._flush_log)
+
+    def _flush_log(self):
+        batch = "\n".join(self._log_buf) + "\n"
+        self._log_buf.clear()
+        self._log_pending = False
         self.console.config(state=tk.NORMAL)
-        self.console.insert(tk.END, msg + "\n")
-        self.console.see(tk.END)
+        self.console.insert(tk.END, batch)
         self.console.config(state=tk.DISABLED)
+        if not self._scroll_pending:
+            self._scroll_pending = True
+            self.root.after(33, self._do_scroll)
+
+    def _do_scroll(self):
+        self._scroll_pending = False
+        self.console.see(tk.END)
 
     # ------------------------------
     # Emulator actions
@@ -341,9 +178,17 @@ class SamsoftEmuNESGUI:
             self.log(f"[ERROR] ROM load failed: {e}")
             return
 
+        old_cart = self.cartridge
         self.rom_path = filename
+        self.rom_basename = os.path.basename(filename)
         self.cartridge = cart
-        self.status_var.set(f"Loaded ROM: {os.path.basename(filename)}")
+        self.status_var.set(f"Loaded ROM: {self.rom_basename}")
+        if old_cart is not None:
+            # Unmap the previous ROM so it can be rebuilt; never fail the new load over it.
+            try:
+                old_cart.close()
+            except Exception as e:
+                self.log(f"[WARN] Could not release previous ROM: {e}")
         self.log(f"[ROM] Loaded: {filename}")
         self._log_header(cart.header)
 
@@ -353,9 +198,9 @@ class SamsoftEmuNESGUI:
     def _log_header(self, h: INESHeader):
         self.log("[HEADER] Format: " + h.format)
         self.log(f"[HEADER] Mapper: {h.mapper} ({h.mapper_name})" + (f"  Submapper: {h.submapper}" if h.submapper is not None else ""))
-        self.log(f"[HEADER] PRG-ROM: {_fmt_size(h.prg_rom_size)}  CHR-ROM: {_fmt_size(h.chr_rom_size)}")
-        self.log(f"[HEADER] PRG-RAM: {_fmt_size(h.prg_ram_size)}  PRG-NVRAM: {_fmt_size(h.prg_nvram_size)}")
-        self.log(f"[HEADER] CHR-RAM: {_fmt_size(h.chr_ram_size)}  CHR-NVRAM: {_fmt_size(h.chr_nvram_size)}")
+        self.log(f"[HEADER] PRG-ROM: {fmt_size(h.prg_rom_size)}  CHR-ROM: {fmt_size(h.chr_rom_size)}")
+        self.log(f"[HEADER] PRG-RAM: {fmt_size(h.prg_ram_size)}  PRG-NVRAM: {fmt_size(h.prg_nvram_size)}")
+        self.log(f"[HEADER] CHR-RAM: {fmt_size(h.chr_ram_size)}  CHR-NVRAM: {fmt_size(h.chr_nvram_size)}")
         self.log(f"[HEADER] Mirroring: {h.mirroring}  Battery: {h.has_battery}  Trainer: {h.has_trainer}")
         self.log(f"[HEADER] TV: {h.tv_system}  VS: {h.vs_unisystem}  PlayChoice10: {h.playchoice10}")
 
@@ -365,10 +210,9 @@ class SamsoftEmuNESGUI:
             return
         self.is_running = True
         self.status_var.set("Running...")
-        base = os.path.basename(self.rom_path)
-        self.log(f"[SYSTEM] Emulating {base} (stub backend)")
+        self.log(f"[SYSTEM] Emulating {self.rom_basename} (stub backend)")
         h = self.cartridge.header
-        self.log(f"[SYSTEM] Mapper {h.mapper} ({h.mapper_name}), PRG={_fmt_size(h.prg_rom_size)}, CHR={_fmt_size(h.chr_rom_size)}")
+        self.log(f"[SYSTEM] Mapper {h.mapper} ({h.mapper_name}), PRG={fmt_size(h.prg_rom_size)}, CHR={fmt_size(h.chr_rom_size)}")
         # TODO: plug in CPU6502/PPU/APU backend
 
     def reset_emulator(self):
@@ -397,35 +241,45 @@ class SamsoftEmuNESGUI:
         if not self.cartridge:
             messagebox.showinfo("Cartridge Info", "No ROM loaded.")
             return
+        if self._cart_info_win is not None:
+            if self._cart_info_for is self.cartridge:
+                self._cart_info_win.deiconify()
+                self._cart_info_win.lift()
+                return
+            self._cart_info_win.destroy()
+
         h = self.cartridge.header
-        lines = [
-            f"Format: {h.format}",
-            f"Mapper: {h.mapper} ({h.mapper_name})" + (f"   Submapper: {h.submapper}" if h.submapper is not None else ""),
-            "",
-            f"PRG-ROM: {_fmt_size(h.prg_rom_size)}",
-            f"CHR-ROM: {_fmt_size(h.chr_rom_size)}" + ("  (uses CHR-RAM)" if h.chr_rom_size == 0 else ""),
-            f"PRG-RAM: {_fmt_size(h.prg_ram_size)}",
-            f"PRG-NVRAM (battery): {_fmt_size(h.prg_nvram_size)}",
-            f"CHR-RAM: {_fmt_size(h.chr_ram_size)}",
-            f"CHR-NVRAM: {_fmt_size(h.chr_nvram_size)}",
-            "",
-            f"Mirroring: {h.mirroring}",
-            f"Battery: {'Yes' if h.has_battery else 'No'}   Trainer: {'Yes' if h.has_trainer else 'No'}",
-            f"VS Unisystem: {'Yes' if h.vs_unisystem else 'No'}   PlayChoice-10: {'Yes' if h.playchoice10 else 'No'}",
-            f"TV System: {h.tv_system}",
-        ]
+        info = _CART_INFO_TMPL({
+            "h": h,
+            "submapper": f"   Submapper: {h.submapper}" if h.submapper is not None else "",
+            "prg_rom": fmt_size(h.prg_rom_size),
+            "chr_rom": fmt_size(h.chr_rom_size),
+            "chr_note": "  (uses CHR-RAM)" if h.chr_rom_size == 0 else "",
+            "prg_ram": fmt_size(h.prg_ram_size),
+            "prg_nvram": fmt_size(h.prg_nvram_size),
+            "chr_ram": fmt_size(h.chr_ram_size),
+            "chr_nvram": fmt_size(h.chr_nvram_size),
+            "battery": "Yes" if h.has_battery else "No",
+            "trainer": "Yes" if h.has_trainer else "No",
+            "vs": "Yes" if h.vs_unisystem else "No",
+            "pc10": "Yes" if h.playchoice10 else "No",
+        })
 
         top = tk.Toplevel(self.root)
         top.title("Cartridge Info")
         top.configure(bg="#1e1e1e")
+        top.protocol("WM_DELETE_WINDOW", top.withdraw)
 
         text = tk.Text(top, width=80, height=20, bg="#0d0d0d", fg="#e0e0e0",
                        insertbackground="white", font=("Consolas", 10))
         text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        text.insert("1.0", "\n".join(lines))
+        text.insert("1.0", info)
         text.configure(state=tk.DISABLED)
 
+        self._cart_info_win = top
+        self._cart_info_for = self.cartridge
+
     def show_about(self):
         messagebox.showinfo("About SamsoftEmu NES",
                             "SamsoftEmu NES v1.1\nTkinter GUI Frontend + iNES/NES2 Parser\nAI Core Edition")
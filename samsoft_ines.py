@@ -0,0 +1,269 @@
+"""
+Shared iNES / NES 2.0 cartridge parser for the SamsoftEmu NES front-ends.
+
+parse_ines_file() maps a .nes file and returns a Cartridge whose PRG/CHR/trainer
+data are zero-copy views into the mapping. Decoded headers are cached, so
+re-opening a ROM skips the header decode.
+"""
+
+import functools
+import mmap
+import os
+import struct
+import sys
+from dataclasses import dataclass, field
+
+
+class INESParseError(ValueError):
+    """Raised when an iNES header cannot be parsed."""
+
+
+# ------------------------------
+# iNES / NES 2.0 Data Structures
+# ------------------------------
+
+@dataclass(slots=True, frozen=True)
+class INESHeader:
+    format: str                 # "iNES" or "NES 2.0" (or "Archaic iNES")
+    mapper: int
+    submapper: int | None
+    mapper_name: str
+    prg_rom_size: int           # bytes
+    chr_rom_size: int           # bytes
+    prg_ram_size: int           # bytes (volatile)
+    prg_nvram_size: int         # bytes (battery-backed)
+    chr_ram_size: int           # bytes
+    chr_nvram_size: int         # bytes
+    mirroring: str              # "Horizontal", "Vertical", or "Four-screen VRAM"
+    has_battery: bool
+    has_trainer: bool
+    four_screen: bool
+    tv_system: str              # "NTSC", "PAL", "Both", etc.
+    vs_unisystem: bool
+    playchoice10: bool
+
+@dataclass(slots=True, frozen=True, eq=False)   # identity eq/hash; never walks ROM data
+class Cartridge:
+    header: INESHeader
+    prg_rom: memoryview         # zero-copy views into the mapped file
+    chr_rom: memoryview
+    trainer: memoryview | None
+    raw_header: bytes
+    # Backing map for the memoryview slices above; kept alive with the cartridge.
+    _mm: mmap.mmap | None = field(default=None, repr=False, compare=False)
+
+    def prg_bytes(self) -> bytes:
+        """PRG-ROM as an owned bytes copy, for APIs that need real bytes."""
+        return self.prg_rom.tobytes()
+
+    def chr_bytes(self) -> bytes:
+        """CHR-ROM as an owned bytes copy, for APIs that need real bytes."""
+        return self.chr_rom.tobytes()
+
+    def close(self):
+        """Release the ROM slices and unmap the backing file.
+        Views taken from prg_rom/chr_rom/trainer should be released first; while
+        any are still alive the file stays mapped until the last one is collected.
+        """
+        for view in (self.prg_rom, self.chr_rom, self.trainer):
+            if view is not None:
+                try:
+                    view.release()
+                except BufferError:
+                    pass   # re-exported (e.g. via memoryview()); freed with its holder
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass   # a sub-slice is still alive; GC unmaps once it dies
+
+
+MAPPER_NAMES: dict[int, str] = {
+    0: "NROM",
+    1: "MMC1 (SxROM)",
+    2: "UNROM (UxROM)",
+    3: "CNROM (CxROM)",
+    4: "MMC3 (TxROM)",
+    5: "MMC5 (ExROM)",
+    7: "AOROM (AxROM)",
+    9: "MMC2 (PxROM)",
+    10: "MMC4 (FxROM)",
+    11: "Color Dreams",
+    13: "CPROM",
+    15: "100-in-1",
+    66: "GxROM/MxROM",
+    69: "FME-7 / Sunsoft 5",
+    71: "Camerica (BF909x)",
+    73: "VRC3",
+    75: "VRC1",
+    76: "VRC4",
+    78: "Irem 74HC161/32",
+    79: "NINA-003/006",
+    85: "VRC7",
+    87: "VRC2",
+    94: "HVC-UN1ROM",
+    118: "TxSROM",
+    119: "TQROM",
+    210: "Namco 129/163",
+    # Many more exist; unknowns will be displayed as "Unknown/Custom".
+}
+
+# Dense name table covering the full 12-bit NES 2.0 mapper range.
+# Names are interned in MAPPER_NAMES too, so both lookups return the same objects.
+_MAPPER_NAME_TABLE: list[str] = [sys.intern("Unknown/Custom")] * 4096
+for _num, _name in MAPPER_NAMES.items():
+    MAPPER_NAMES[_num] = _MAPPER_NAME_TABLE[_num] = sys.intern(_name)
+del _num, _name
+
+
+# Magic (as a little-endian u32), PRG/CHR units, flags 6..12, then three bytes of padding.
+_INES_HDR = struct.Struct("<IBBBBBBBBBxxx")
+_INES_MAGIC = 0x1A53454E   # b"NES\x1A"
+
+# Header enum strings, interned once so every parsed header shares the same objects.
+_MIRRORING_NAMES: tuple[str, ...] = tuple(map(sys.intern, ("Horizontal", "Vertical", "Four-screen VRAM")))
+_FORMAT_NAMES: tuple[str, ...] = tuple(map(sys.intern, ("iNES", "NES 2.0")))   # indexed by is_nes20
+# NES 2.0 byte 12 timing (bits 0-1); iNES 1.0 only distinguishes the first two.
+_TV_NAMES: tuple[str, ...] = tuple(map(sys.intern, ("NTSC", "PAL", "Both (NTSC/PAL)", "Dendy/Reserved")))
+
+# Flag bytes decoded once per possible value, indexed by the raw byte.
+# flags6 -> (vertical, battery, trainer, four_screen, mirroring)
+_FLAGS6_TABLE: tuple[tuple[bool, bool, bool, bool, str], ...] = tuple(
+    (bool(b & 0x01), bool(b & 0x02), bool(b & 0x04), bool(b & 0x08),
+     _MIRRORING_NAMES[2] if b & 0x08 else _MIRRORING_NAMES[b & 0x01])
+    for b in range(256)
+)
+# flags7 -> (is_nes20, vs_unisystem, playchoice10)
+# NES 2.0 if ((flags7 & 0x0C) == 0x08). Otherwise iNES 1.0 (or archaic).
+# NES 2.0 bits 0-1 are a 2-bit console type (1 = VS System, 2 = PlayChoice-10,
+# 3 = extended); iNES 1.0 treats them as two independent flags.
+_FLAGS7_TABLE: tuple[tuple[bool, bool, bool], ...] = tuple(
+    (True, (b & 0x03) == 1, (b & 0x03) == 2) if (b & 0x0C) == 0x08
+    else (False, bool(b & 0x01), bool(b & 0x02))
+    for b in range(256)
+)
+
+
+def fmt_size(n_bytes: int) -> str:
+    """Human-readable size: "512 B", "16 KB", "1.5 KB", "1 MB" (one decimal when not exact)."""
+    # PRG/CHR/RAM sizes are whole KB multiples, so the integer paths cover real ROMs.
+    if n_bytes < 1024:
+        return f"{n_bytes} B"
+    if n_bytes < 1048576:
+        if n_bytes & 1023 == 0:
+            return f"{n_bytes >> 10} KB"
+        return f"{n_bytes / 1024:.1f} KB"
+    if n_bytes & 1048575 == 0:
+        return f"{n_bytes >> 20} MB"
+    return f"{n_bytes / 1048576:.1f} MB"
+
+
+# NES 2.0 RAM/NVRAM size encoding: 2^exp × 64 bytes (0 means absent), per nibble.
+_EXP_SIZES: tuple[int, ...] = tuple(0 if e == 0 else (64 << e) for e in range(16))
+
+
+@functools.lru_cache(maxsize=64)
+def _decode_header(raw: bytes) -> INESHeader:
+    """Decode a 16-byte iNES / NES 2.0 header.
+    Memoized on the raw bytes; INESHeader is immutable, so re-opening a ROM
+    reuses the decoded header while the file data itself is always re-mapped.
+    """
+    (magic, prg_units, chr_units,     # PRG in 16KB units, CHR in 8KB units
+     flags6, flags7, flags8, flags9,
+     flags10, flags11, flags12) = _INES_HDR.unpack(raw)
+    if magic != _INES_MAGIC:
+        raise INESParseError("Missing NES\x1A magic; not an iNES/NES2.0 ROM.")
+
+    # Detect format
+    is_nes20, vs_unisystem, playchoice10 = _FLAGS7_TABLE[flags7]
+    format_name = _FORMAT_NAMES[is_nes20]
+
+    # Mapper and Submapper: bits 0..7 from flags 6/7, bits 8..11 from flags8 (NES 2.0 only)
+    mapper = ((flags6 >> 4) | (flags7 & 0xF0) | ((flags8 & 0x0F) << 8)) & (0xFFF if is_nes20 else 0xFF)
+    submapper: int | None = (flags8 >> 4) if is_nes20 else None
+
+    # Sizes
+    if is_nes20:
+        prg_rom_size = (prg_units | ((flags9 & 0x0F) << 8)) * 16 * 1024
+        chr_rom_size = (chr_units | ((flags9 & 0xF0) << 4)) * 8 * 1024
+        prg_ram_size = _EXP_SIZES[flags10 & 0x0F]
+        prg_nvram_size = _EXP_SIZES[flags10 >> 4]
+        chr_ram_size = _EXP_SIZES[flags11 & 0x0F]
+        chr_nvram_size = _EXP_SIZES[flags11 >> 4]
+    else:
+        prg_rom_size = prg_units * 16 * 1024
+        chr_rom_size = chr_units * 8 * 1024
+        # iNES: byte 8 is PRG-RAM size in 8KB units; 0 implies 8KB for some mappers.
+        prg_ram_size = (flags8 * 8 * 1024) if flags8 else (8 * 1024 if mapper in (1, 4) else 0)
+        prg_nvram_size = 0
+        # If no CHR ROM, assume 8KB CHR-RAM (common).
+        chr_ram_size = 8 * 1024 if chr_rom_size == 0 else 0
+        chr_nvram_size = 0
+
+    # Flags
+    vert_mirr, has_battery, has_trainer, four_screen, mirroring = _FLAGS6_TABLE[flags6]
+
+    # TV system (best-effort)
+    if is_nes20:
+        tv_system = _TV_NAMES[flags12 & 0x03]
+    else:
+        tv_system = _TV_NAMES[flags9 & 0x01]
+
+    return INESHeader(
+        format=format_name,
+        mapper=mapper,
+        submapper=submapper,
+        mapper_name=_MAPPER_NAME_TABLE[mapper],   # mapper is at most 12 bits
+        prg_rom_size=prg_rom_size,
+        chr_rom_size=chr_rom_size,
+        prg_ram_size=prg_ram_size,
+        prg_nvram_size=prg_nvram_size,
+        chr_ram_size=chr_ram_size,
+        chr_nvram_size=chr_nvram_size,
+        mirroring=mirroring,
+        has_battery=has_battery,
+        has_trainer=has_trainer,
+        four_screen=four_screen,
+        tv_system=tv_system,
+        vs_unisystem=vs_unisystem,
+        playchoice10=playchoice10,
+    )
+
+
+def parse_ines_file(path: str) -> Cartridge:
+    """Parse a .nes file, returning a Cartridge with header + PRG/CHR slices.
+    Supports iNES 1.0 and (partially) NES 2.0.
+    Raises INESParseError on invalid header or inconsistent sizes.
+    The Cartridge owns a mapping of the file; close() it when done.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < 16:
+            raise INESParseError("File too small to contain an iNES header.")
+        # Map the file instead of read()ing it: PRG/CHR become zero-copy views.
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    data = memoryview(mm)
+
+    try:
+        header = bytes(data[:16])
+        ines_header = _decode_header(header)
+
+        # Compute data offsets; one size check covers trainer, PRG and CHR.
+        offset = 16 + 512 if ines_header.has_trainer else 16
+        chr_offset = offset + ines_header.prg_rom_size
+        want = chr_offset + ines_header.chr_rom_size
+        if len(data) < want:
+            raise INESParseError(f"File truncated: header indicates {want} bytes but file has {len(data)}.")
+    except BaseException:
+        # Unmap right away rather than leaving the file mapped until GC.
+        data.release()
+        mm.close()
+        raise
+
+    return Cartridge(
+        header=ines_header,
+        prg_rom=data[offset:chr_offset],
+        chr_rom=data[chr_offset:want],
+        trainer=data[16:offset] if ines_header.has_trainer else None,
+        raw_header=header,
+        _mm=mm,
+    )
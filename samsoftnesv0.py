@@ -2,158 +2,47 @@
 """
 SamsoftEmu NES v2.0 (Tkinter GUI Frontend with iNES parsing)
 Frontend for a future FCEUX-class emulator.
+Header parsing is shared with the v1.1 front-end through samsoft_ines.py.
 """
 
 import os
 import sys
 import tkinter as tk
-from dataclasses import dataclass
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
-
-class INESParseError(Exception):
-    """Raised when an iNES header cannot be parsed."""
-
-
-@dataclass
-class INESHeader:
-    prg_rom_size_bytes: int
-    chr_rom_size_bytes: int
-    prg_ram_size_bytes: int
-    prg_nvram_size_bytes: int
-    chr_ram_size_bytes: int
-    chr_nvram_size_bytes: int
-    mapper: int
-    submapper: int
-    mirroring: str
-    has_battery_backed_ram: bool
-    has_trainer: bool
-    is_nes2: bool
-    is_vs_system: bool
-    is_playchoice10: bool
-    tv_system: str
-
-    @classmethod
-    def from_path(cls, path):
-        with open(path, "rb") as rom:
-            header = rom.read(16)
-        if len(header) < 16:
-            raise INESParseError("File too small to contain an iNES header.")
-        if header[:4] != b"NES\x1a":
-            raise INESParseError("Missing iNES magic number (expected 'NES<0x1A>').")
-
-        flags6 = header[6]
-        flags7 = header[7]
-        is_nes2 = (flags7 & 0x0C) == 0x08
-
-        mapper = (flags6 >> 4) | (flags7 & 0xF0)
-        submapper = 0
-        prg_rom_units = header[4]
-        chr_rom_units = header[5]
-
-        if is_nes2:
-            mapper |= (header[8] & 0x0F) << 8
-            mapper |= (header[9] & 0x0F) << 12
-            submapper = header[8] >> 4
-            prg_rom_units |= (header[9] & 0x0F) << 8
-            chr_rom_units |= (header[9] >> 4) << 8
-
-        prg_rom_size_bytes = prg_rom_units * 16384
-        chr_rom_size_bytes = chr_rom_units * 8192
-
-        has_battery = bool(flags6 & 0x02)
-        has_trainer = bool(flags6 & 0x04)
-
-        mirroring = "Four-screen" if (flags6 & 0x08) else ("Vertical" if (flags6 & 0x01) else "Horizontal")
-
-        console_type = flags7 & 0x03
-        is_vs_system = console_type == 1
-        is_playchoice10 = console_type == 2
-
-        if is_nes2:
-            tv_bits = header[12] & 0x03
-            tv_system = {0: "NTSC", 1: "PAL", 2: "Multi-region", 3: "Hd/Nst Hybrid"}.get(tv_bits, "Unknown")
-            prg_ram_size_bytes = cls._decode_nes2_size(header[10] & 0x0F)
-            prg_nvram_size_bytes = cls._decode_nes2_size(header[10] >> 4)
-            chr_ram_size_bytes = cls._decode_nes2_size(header[11] & 0x0F)
-            chr_nvram_size_bytes = cls._decode_nes2_size(header[11] >> 4)
-        else:
-            tv_system = "PAL" if (header[9] & 0x01) else "NTSC"
-            prg_ram_units = header[8] if header[8] else 1
-            prg_ram_size_bytes = prg_ram_units * 8192
-            prg_nvram_size_bytes = 0
-            chr_ram_size_bytes = 0
-            chr_nvram_size_bytes = 0
-
-        return cls(
-            prg_rom_size_bytes=prg_rom_size_bytes,
-            chr_rom_size_bytes=chr_rom_size_bytes,
-            prg_ram_size_bytes=prg_ram_size_bytes,
-            prg_nvram_size_bytes=prg_nvram_size_bytes,
-            chr_ram_size_bytes=chr_ram_size_bytes,
-            chr_nvram_size_bytes=chr_nvram_size_bytes,
-            mapper=mapper,
-            submapper=submapper,
-            mirroring=mirroring,
-            has_battery_backed_ram=has_battery,
-            has_trainer=has_trainer,
-            is_nes2=is_nes2,
-            is_vs_system=is_vs_system,
-            is_playchoice10=is_playchoice10,
-            tv_system=tv_system,
-        )
-
-    @staticmethod
-    def _decode_nes2_size(shift):
-        if shift == 0:
-            return 0
-        return 1 << (shift + 6)
-
-    @staticmethod
-    def _format_bytes(byte_count):
-        if byte_count == 0:
-            return "0 B"
-        units = ["B", "KB", "MB", "GB"]
-        value = float(byte_count)
-        for unit in units:
-            if value < 1024 or unit == units[-1]:
-                if value.is_integer():
-                    return f"{int(value)} {unit}"
-                return f"{value:.2f} {unit}".rstrip("0").rstrip(".")
-            value /= 1024
-        return f"{int(value)} GB"
-
-    def summary_lines(self):
-        lines = []
-        format_label = "NES 2.0" if self.is_nes2 else "iNES 1.0"
-        mapper_line = f"Mapper {self.mapper}"
-        if self.submapper:
-            mapper_line += f" (submapper {self.submapper})"
-        lines.append(f"Format: {format_label}")
-        lines.append(mapper_line)
-        lines.append(f"PRG ROM: {self._format_bytes(self.prg_rom_size_bytes)}")
-        lines.append(f"CHR ROM: {self._format_bytes(self.chr_rom_size_bytes)}")
-        if self.prg_ram_size_bytes or self.prg_nvram_size_bytes:
-            ram_desc = f"PRG RAM: {self._format_bytes(self.prg_ram_size_bytes)}"
-            if self.prg_nvram_size_bytes:
-                ram_desc += f" (NV: {self._format_bytes(self.prg_nvram_size_bytes)})"
-            lines.append(ram_desc)
-        else:
-            lines.append("PRG RAM: none declared")
-        if self.chr_ram_size_bytes or self.chr_nvram_size_bytes:
-            chr_desc = f"CHR RAM: {self._format_bytes(self.chr_ram_size_bytes)}"
-            if self.chr_nvram_size_bytes:
-                chr_desc += f" (NV: {self._format_bytes(self.chr_nvram_size_bytes)})"
-            lines.append(chr_desc)
-        lines.append(f"Mirroring: {self.mirroring}")
-        lines.append(f"Battery-backed RAM: {'yes' if self.has_battery_backed_ram else 'no'}")
-        lines.append(f"Trainer present: {'yes' if self.has_trainer else 'no'}")
-        if self.is_vs_system:
-            lines.append("Console type: VS System")
-        if self.is_playchoice10:
-            lines.append("Console type: PlayChoice-10")
-        lines.append(f"TV System: {self.tv_system}")
-        return lines
+from samsoft_ines import INESHeader, INESParseError, fmt_size, parse_ines_file
+
+
+def _summary_lines(h: INESHeader) -> list[str]:
+    lines = []
+    mapper_line = f"Mapper {h.mapper}"
+    if h.submapper:
+        mapper_line += f" (submapper {h.submapper})"
+    lines.append(f"Format: {h.format}")
+    lines.append(mapper_line)
+    lines.append(f"PRG ROM: {fmt_size(h.prg_rom_size)}")
+    lines.append(f"CHR ROM: {fmt_size(h.chr_rom_size)}")
+    if h.prg_ram_size or h.prg_nvram_size:
+        ram_desc = f"PRG RAM: {fmt_size(h.prg_ram_size)}"
+        if h.prg_nvram_size:
+            ram_desc += f" (NV: {fmt_size(h.prg_nvram_size)})"
+        lines.append(ram_desc)
+    else:
+        lines.append("PRG RAM: none declared")
+    if h.chr_ram_size or h.chr_nvram_size:
+        chr_desc = f"CHR RAM: {fmt_size(h.chr_ram_size)}"
+        if h.chr_nvram_size:
+            chr_desc += f" (NV: {fmt_size(h.chr_nvram_size)})"
+        lines.append(chr_desc)
+    lines.append(f"Mirroring: {h.mirroring}")
+    lines.append(f"Battery-backed RAM: {'yes' if h.has_battery else 'no'}")
+    lines.append(f"Trainer present: {'yes' if h.has_trainer else 'no'}")
+    if h.vs_unisystem:
+        lines.append("Console type: VS System")
+    if h.playchoice10:
+        lines.append("Console type: PlayChoice-10")
+    lines.append(f"TV System: {h.tv_system}")
+    return lines
 
 
 class SamsoftEmuNESGUI:
@@ -165,6 +54,7 @@ class SamsoftEmuNESGUI:
 
         # Emulator state placeholders
         self.rom_path = None
+        self.rom_basename = None
         self.ines_header = None
         self.is_running = False
         self.version = "2.0"
@@ -250,7 +140,7 @@ class SamsoftEmuNESGUI:
         if not filename:
             return
         try:
-            ines_header = INESHeader.from_path(filename)
+            cart = parse_ines_file(filename)
         except (IOError, OSError) as io_err:
             messagebox.showerror("File Error", f"Unable to read ROM: {io_err}")
             self.log(f"[ERROR] Unable to read ROM: {io_err}")
@@ -259,16 +149,19 @@ class SamsoftEmuNESGUI:
             messagebox.showerror("Invalid ROM", str(parse_err))
             self.log(f"[ERROR] {parse_err}")
             return
+        # Only the header is used here, so release the file mapping right away.
+        ines_header = cart.header
+        cart.close()
 
         self.rom_path = filename
+        self.rom_basename = os.path.basename(filename)
         self.ines_header = ines_header
-        rom_name = os.path.basename(filename)
         mapper_info = f"Mapper {ines_header.mapper}"
         if ines_header.submapper:
             mapper_info += f"/{ines_header.submapper}"
-        self.status_var.set(f"Loaded ROM: {rom_name} | {mapper_info}")
+        self.status_var.set(f"Loaded ROM: {self.rom_basename} | {mapper_info}")
         self.log(f"[ROM] Loaded: {filename}")
-        for detail in ines_header.summary_lines():
+        for detail in _summary_lines(ines_header):
             self.log(f"[iNES] {detail}")
 
     def run_emulator(self):
@@ -276,13 +169,12 @@ class SamsoftEmuNESGUI:
             messagebox.showwarning("No ROM", "Please load a ROM first!")
             return
         self.is_running = True
-        rom_name = os.path.basename(self.rom_path)
         if self.ines_header:
             header_tag = f"Mapper {self.ines_header.mapper}"
         else:
             header_tag = "Unknown mapper"
         self.status_var.set("Running...")
-        self.log(f"[SYSTEM] Emulating {rom_name} ({header_tag}, stub backend)")
+        self.log(f"[SYSTEM] Emulating {self.rom_basename} ({header_tag}, stub backend)")
         # TODO: plug in CPU6502/PPU/APU backend
 
     def reset_emulator(self):